@@ -1,19 +1,44 @@
+from typing import List, Union
+
+import pandas as pd
 import streamlit as st
 from streamlit_echarts import st_pyecharts
 
-from charts import draw_pro_kline, draw_result_bar
-from frames import akshare_selector_ui, backtrader_selector_ui, params_selector_ui
+from charts import draw_distribution_bar, draw_pro_kline, draw_result_bar
+from frames import (
+    akshare_selector_ui,
+    backtrader_selector_ui,
+    cache_stats_ui,
+    multi_params_selector_ui,
+    params_selector_ui,
+    robustness_selector_ui,
+)
+from strategy.base import parse_param_tag
+from utils.cache import cache
+from utils.jobs import get_job_queue
 from utils.load import load_strategy
 from utils.logs import logger
-from utils.processing import gen_stock_df, run_backtrader
-from utils.schemas import StrategyBase
+from utils.processing import gen_stock_df
+from utils.robustness import loss_probability, robustness_analysis, summarize
+from utils.schemas import AkshareParams, BacktraderParams, StrategyBase
 
 st.set_page_config(page_title="backtrader", page_icon=":chart_with_upwards_trend:", layout="wide")
 
+COLUMNS = {
+    "日期": "date",
+    "开盘": "open",
+    "收盘": "close",
+    "最高": "high",
+    "最低": "low",
+    "成交量": "volume",
+}
+
 
 def main():
     ak_params = akshare_selector_ui()
     bt_params = backtrader_selector_ui()
+    live = st.sidebar.checkbox("incremental update", help="checkpoint each combo and only backtest new bars")
+    cache_stats_ui(cache.stats())
     if ak_params.symbol:
         stock_df = gen_stock_df(ak_params)
         if stock_df.empty:
@@ -25,26 +50,95 @@ def main():
         st_pyecharts(kline, height="500px")
 
         st.subheader("Strategy")
-        name = st.selectbox("strategy", list(strategy_dict.keys()))
-        submitted, params = params_selector_ui(strategy_dict[name])
+        names = st.multiselect("strategy", list(strategy_dict.keys()), default=list(strategy_dict.keys())[:1])
+        if not names:
+            return
+        if len(names) == 1:
+            submitted, params = params_selector_ui(strategy_dict[names[0]])
+            strategy = StrategyBase(name=names[0], params=params)
+        else:
+            # 多策略在一次任务中完成参数优化, 不支持增量回测
+            submitted, params = multi_params_selector_ui({name: strategy_dict[name] for name in names})
+            strategy = [StrategyBase(name=name, params=params[name]) for name in names]
         if submitted:
             logger.info(f"akshare: {ak_params}")
             logger.info(f"backtrader: {bt_params}")
-            stock_df = stock_df.rename(
-                columns={
-                    "日期": "date",
-                    "开盘": "open",
-                    "收盘": "close",
-                    "最高": "high",
-                    "最低": "low",
-                    "成交量": "volume",
-                }
+            stock_df = stock_df.rename(columns=COLUMNS)
+            job_id = get_job_queue().submit(
+                stock_df, strategy, bt_params, ak_params if live and len(names) == 1 else None
             )
-            strategy = StrategyBase(name=name, params=params)
-            par_df = run_backtrader(stock_df, strategy, bt_params)
-            st.dataframe(par_df.style.highlight_max(subset=par_df.columns[-3:]))
-            bar = draw_result_bar(par_df)
-            st_pyecharts(bar, height="500px")
+            st.session_state["job"] = (job_id, ak_params, strategy, bt_params)
+
+        if "job" in st.session_state:
+            show_job(*st.session_state["job"])
+
+
+def best_strategy(par_df: pd.DataFrame, strategy: Union[StrategyBase, List[StrategyBase]]) -> StrategyBase:
+    """年化收益最高的参数组合"""
+    best = par_df["return"].idxmax()
+    if isinstance(strategy, list):
+        return StrategyBase(name=par_df.loc[best, "strategy"], params=parse_param_tag(par_df.loc[best, "params"]))
+    return StrategyBase(name=strategy.name, params={k: par_df.loc[best, k].item() for k in strategy.params})
+
+
+@st.fragment(run_every=1)
+def wait_job(job_id: str) -> None:
+    """每秒刷新任务状态, 任务结束后重新运行页面展示结果"""
+    info = get_job_queue().info(job_id)
+    if info is not None and info.status in ("pending", "running"):
+        st.info(f"Job {job_id} is {info.status}...")
+    else:
+        st.rerun()
+
+
+@st.fragment
+def show_job(
+    job_id: str,
+    ak_params: AkshareParams,
+    strategy: Union[StrategyBase, List[StrategyBase]],
+    bt_params: BacktraderParams,
+) -> None:
+    """轮询回测任务状态, 完成后展示结果和最优参数的稳健性分析"""
+    job_queue = get_job_queue()
+    info = job_queue.info(job_id)
+    if info is None:
+        st.warning(f"Job {job_id} expired, please submit again.")
+        return
+    if info.status == "failed":
+        st.error(f"Job {job_id} failed: {info.error}")
+        return
+    if info.status != "done":
+        wait_job(job_id)
+        return
+
+    par_df = job_queue.result(job_id)
+    if par_df is None:
+        st.warning(f"Job {job_id} expired, please submit again.")
+        return
+    st.dataframe(par_df.style.highlight_max(subset=par_df.columns[-3:]))
+    bar = draw_result_bar(par_df)
+    st_pyecharts(bar, height="500px")
+
+    st.subheader("Robustness")
+    submitted, mc_params = robustness_selector_ui()
+    if submitted:
+        # 对年化收益最高的参数组合做蒙特卡洛分析
+        winner = best_strategy(par_df, strategy)
+        stock_df = gen_stock_df(ak_params).rename(columns=COLUMNS)
+        try:
+            with st.spinner(f"Monte Carlo {winner.name} {winner.params}"):
+                mc_df = robustness_analysis(stock_df, winner, bt_params, mc_params)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        if mc_df.empty:
+            st.warning(f"No {mc_params.method} returns to resample for {winner.name} {winner.params}.")
+            return
+        st.metric("P(loss)", f"{loss_probability(mc_df):.1%}")
+        st.dataframe(summarize(mc_df))
+        for col, name in zip(st.columns(3), mc_df.columns):
+            with col:
+                st_pyecharts(draw_distribution_bar(mc_df[name]), height="300px")
 
 
 strategy_dict = load_strategy("./config/strategy.yaml")
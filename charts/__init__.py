@@ -1,4 +1,5 @@
 from .results import draw_result_bar
+from .robustness import draw_distribution_bar
 from .stock import draw_pro_kline
 
-__all__ = ["draw_pro_kline", "draw_result_bar"]
+__all__ = ["draw_distribution_bar", "draw_pro_kline", "draw_result_bar"]
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+from pyecharts import options as opts
+from pyecharts.charts import Bar
+
+
+def draw_distribution_bar(series: pd.Series, bins: int = 50) -> Bar:
+    values = series.dropna().values
+    counts, edges = np.histogram(values, bins=bins)
+    x_data = [f"{(left + right) / 2:.2f}" for left, right in zip(edges[:-1], edges[1:])]
+    bar = (
+        Bar()
+        .add_xaxis(x_data)
+        .add_yaxis(series.name, counts.tolist(), category_gap=0)
+        .set_global_opts(
+            title_opts=opts.TitleOpts(title=series.name),
+            tooltip_opts=opts.TooltipOpts(trigger="axis"),
+            legend_opts=opts.LegendOpts(is_show=False),
+        )
+        .set_series_opts(label_opts=opts.LabelOpts(is_show=False))
+    )
+
+    return bar
@@ -1,4 +1,11 @@
-from .form import params_selector_ui
-from .sidebar import akshare_selector_ui, backtrader_selector_ui
+from .form import multi_params_selector_ui, params_selector_ui, robustness_selector_ui
+from .sidebar import akshare_selector_ui, backtrader_selector_ui, cache_stats_ui
 
-__all__ = ["akshare_selector_ui", "backtrader_selector_ui", "params_selector_ui"]
+__all__ = [
+    "akshare_selector_ui",
+    "backtrader_selector_ui",
+    "cache_stats_ui",
+    "multi_params_selector_ui",
+    "params_selector_ui",
+    "robustness_selector_ui",
+]
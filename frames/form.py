@@ -1,18 +1,56 @@
 import streamlit as st
 
+from utils.schemas import RobustnessParams
 
-def params_selector_ui(params: dict) -> tuple[bool, dict]:
+
+def _params_inputs(params: dict, prefix: str = "") -> dict:
     params_parse = dict()
+    for param in params:
+        if param["type"] == "int":
+            col1, col2 = st.columns(2)
+            with col1:
+                min_number = st.number_input(
+                    "min " + param["name"], value=param["min"], key=f"{prefix}min_{param['name']}"
+                )
+            with col2:
+                max_number = st.number_input(
+                    "max " + param["name"], value=param["max"], key=f"{prefix}max_{param['name']}"
+                )
+            params_parse[param["name"]] = range(min_number, max_number, param["step"])
+        else:
+            pass
+    return params_parse
+
+
+def params_selector_ui(params: dict) -> tuple[bool, dict]:
     with st.form("params"):
-        for param in params:
-            if param["type"] == "int":
-                col1, col2 = st.columns(2)
-                with col1:
-                    min_number = st.number_input("min " + param["name"], value=param["min"])
-                with col2:
-                    max_number = st.number_input("max " + param["name"], value=param["max"])
-                params_parse[param["name"]] = range(min_number, max_number, param["step"])
-            else:
-                pass
+        params_parse = _params_inputs(params)
+        submitted = st.form_submit_button("Submit")
+    return submitted, params_parse
+
+
+def multi_params_selector_ui(strategies: dict) -> tuple[bool, dict]:
+    params_parse = dict()
+    with st.form("multi_params"):
+        for name, params in strategies.items():
+            st.markdown(f"**{name}**")
+            params_parse[name] = _params_inputs(params, prefix=f"{name}_")
         submitted = st.form_submit_button("Submit")
     return submitted, params_parse
+
+
+def robustness_selector_ui() -> tuple[bool, RobustnessParams]:
+    with st.form("robustness"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            method = st.selectbox("resample", ("bars", "trades"))
+        with col2:
+            n_paths = st.number_input("paths", min_value=100, value=2000, step=500)
+        with col3:
+            block_size = st.number_input("block size", min_value=1, value=20, step=5)
+        with col4:
+            slippage = st.number_input(
+                "slippage noise", min_value=0.0, max_value=0.1, value=0.0005, step=0.0001, format="%.4f"
+            )
+        submitted = st.form_submit_button("Run Monte Carlo")
+    return submitted, RobustnessParams(method=method, n_paths=n_paths, block_size=block_size, slippage=slippage)
@@ -2,7 +2,7 @@ import datetime
 
 import streamlit as st
 
-from utils.schemas import AkshareParams, BacktraderParams
+from utils.schemas import AkshareParams, BacktraderParams, CacheStats
 
 
 def akshare_selector_ui() -> AkshareParams:
@@ -45,3 +45,21 @@ def backtrader_selector_ui() -> BacktraderParams:
         commission_fee=commission_fee,
         stake=stake,
     )
+
+
+def cache_stats_ui(stats: CacheStats) -> None:
+    """cache stats
+
+    :param stats: CacheStats
+    """
+    with st.sidebar.expander("Cache"):
+        st.metric("size (MB)", f"{stats.size_bytes / 2**20:.1f} / {stats.max_bytes / 2**20:.0f}")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("hits", stats.hits)
+        col2.metric("misses", stats.misses)
+        col3.metric("evictions", stats.evictions)
+        st.caption(
+            f"{stats.entries} entries in memory, "
+            f"{stats.spilled_entries} spilled ({stats.spill_size_bytes / 2**20:.1f} MB), "
+            f"{stats.spill_hits} spill hits"
+        )
@@ -1,5 +1,7 @@
 from .ma import MaStrategy
+from .ma_kernel import MaKernelStrategy
 from .macross import MaCrossStrategy
+from .macross_kernel import MaCrossKernelStrategy
 
 
-__all__ = ["MaStrategy", "MaCrossStrategy"]
+__all__ = ["MaStrategy", "MaCrossStrategy", "MaKernelStrategy", "MaCrossKernelStrategy"]
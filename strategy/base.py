@@ -1,15 +1,79 @@
-from typing import Optional
+import ast
+from typing import Any, Dict, Optional
 
 import backtrader as bt
 
 from utils.logs import logger
+from utils.schemas import Checkpoint
+
+
+def param_tag(params: Dict[str, Any]) -> str:
+    """参数组合标签, 如 maperiod_10"""
+    return " ".join(f"{k}_{v}" for k, v in params.items() if k not in ("printlog", "resume"))
+
+
+def parse_param_tag(tag: str) -> Dict[str, Any]:
+    """解析参数组合标签, 如 maperiod_10 -> {"maperiod": 10}"""
+    params = {}
+    for item in tag.split():
+        name, value = item.rsplit("_", 1)
+        try:
+            params[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            params[name] = value
+    return params
 
 
 class BaseStrategy(bt.Strategy):
-    """base strategy"""
+    """base strategy
+
+    增量回测要求子类在 next() 开头调用 self.warming_up(), 并把未成交订单保存在 self.order.
+    指标只依赖最近 minperiod 根 bar (如 SMA) 时可设置 fixed_window = True, 增量回测只用
+    minperiod 根 bar 预热; 默认从回测开始日期重新计算指标 (如 EMA 依赖全部历史 bar)
+    """
 
     _name = "base"
-    params = (("printlog", False),)
+    params = (("printlog", False), ("resume", None))
+
+    # 指标是否只依赖最近 minperiod 根 bar
+    fixed_window = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.order = None
+
+    def checkpoint(self) -> Optional[Checkpoint]:
+        """增量模式下当前参数组合的检查点, 由 resume 参数按参数组合标签传入"""
+        if not self.params.resume:
+            return None
+        return self.params.resume.get(param_tag(self.params._getkwargs()))
+
+    def start(self) -> None:
+        # 增量模式: 恢复检查点时的现金和持仓
+        self._checkpoint = self.checkpoint()
+        if self._checkpoint is not None:
+            self.broker.set_cash(self._checkpoint.cash)
+            self.broker.positions[self.datas[0]] = bt.Position(
+                size=self._checkpoint.position_size, price=self._checkpoint.position_price
+            )
+
+    def warming_up(self) -> bool:
+        """增量模式下, 检查点及之前的 bar 只用于指标预热, 不产生新信号
+
+        在检查点当天重新提交检查点时未成交的订单, 使其在下一根 bar 成交
+        """
+        # 记录调用, CheckpointAnalyzer 据此检查子类是否遵守增量回测要求
+        self._warming_up_len = len(self)
+        ckpt = self._checkpoint
+        if ckpt is None:
+            return False
+        dt = self.datas[0].datetime.date(0)
+        if dt == ckpt.date and ckpt.order_size:
+            if ckpt.order_size > 0:
+                self.order = self.buy(size=ckpt.order_size)
+            else:
+                self.order = self.sell(size=-ckpt.order_size)
+        return dt <= ckpt.date
 
     def log(self, txt: str, dt: Optional[bt.datetime.date] = None, doprint: bool = False) -> None:
         """Logging function for this strategy"""
@@ -57,8 +121,7 @@ class BaseStrategy(bt.Strategy):
         pass
 
     def stop(self) -> None:
-        params = [f"{k}_{v}" for k, v in self.params._getkwargs().items() if k != "printlog"]
         self.log(
-            "(%s %s) Ending Value %.2f" % (self._name, " ".join(params), self.broker.getvalue()),
+            "(%s %s) Ending Value %.2f" % (self._name, param_tag(self.params._getkwargs()), self.broker.getvalue()),
             doprint=True,
         )
@@ -0,0 +1,80 @@
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def jit(func: Callable) -> Callable:
+    """使用 Numba 编译, 未安装 Numba 时直接返回原函数"""
+    if njit is None:
+        return func
+    return njit(cache=True)(func)
+
+
+def sma(x: np.ndarray, period: int) -> np.ndarray:
+    """简单移动平均, 前 period - 1 个值为 NaN"""
+    out = np.full(len(x), np.nan)
+    if 0 < period <= len(x):
+        out[period - 1 :] = np.lib.stride_tricks.sliding_window_view(x, period).mean(axis=1)
+    return out
+
+
+class IndicatorSpec(NamedTuple):
+    """指标定义, 如 IndicatorSpec(sma, "close", ("maperiod",)) 表示 sma(close, maperiod)"""
+
+    func: Callable[..., np.ndarray]
+    source: str
+    params: Tuple[str, ...]
+
+    def key(self, params: Dict[str, Any]) -> tuple:
+        """指标缓存键, 相同函数、数据列和参数值的指标只计算一次
+
+        使用函数对象本身而不是函数名, 不同模块中的同名函数不会共用缓存
+        """
+        return (self.func, self.source) + tuple(params[name] for name in self.params)
+
+
+class KernelStrategy:
+    """向量化策略
+
+    kernel 是逐 bar 计算目标持仓的纯函数, 参数为 open, high, low, close, volume 和 indicators
+    计算出的指标数组, 返回每根 bar 收盘后的目标持仓 (以 stake 为单位), NaN 表示不调整持仓.
+    kernel 不感知实际持仓, 下单、资金检查、成交和佣金由 utils.simulator 统一模拟, 被拒绝的买单
+    只在之后再次出现目标持仓时重新下单. kernel 使用 jit 装饰时由 Numba 编译
+
+    Args:
+        kernel (Callable[..., np.ndarray]): 目标持仓函数
+        indicators (Tuple[IndicatorSpec, ...]): 传入 kernel 的指标, 按顺序排列
+        params (Dict[str, Any]): 参数及默认值
+    """
+
+    def __init__(
+        self,
+        kernel: Callable[..., np.ndarray],
+        indicators: Tuple[IndicatorSpec, ...],
+        params: Dict[str, Any],
+    ) -> None:
+        self.kernel = kernel
+        self.indicators = indicators
+        self.params = params
+
+    def compute_indicators(
+        self, data: Dict[str, np.ndarray], params: Dict[str, Any], cache: Dict[tuple, np.ndarray]
+    ) -> Tuple[np.ndarray, ...]:
+        """计算指标, 已在 cache 中的指标直接复用"""
+        indicators = []
+        for spec in self.indicators:
+            key = spec.key(params)
+            if key not in cache:
+                cache[key] = spec.func(data[spec.source], *(params[name] for name in spec.params))
+            indicators.append(cache[key])
+        return tuple(indicators)
+
+    def target(self, data: Dict[str, np.ndarray], params: Dict[str, Any], cache: Dict[tuple, np.ndarray]) -> np.ndarray:
+        """计算目标持仓"""
+        indicators = self.compute_indicators(data, {**self.params, **params}, cache)
+        return self.kernel(data["open"], data["high"], data["low"], data["close"], data["volume"], *indicators)
@@ -7,6 +7,8 @@ class MaStrategy(BaseStrategy):
     """Ma strategy"""
 
     _name = "Ma"
+    # SMA only looks back maperiod bars, so incremental runs only re-warm minperiod bars
+    fixed_window = True
     params = (
         ("maperiod", 15),
         ("printlog", False),
@@ -30,7 +32,8 @@ class MaStrategy(BaseStrategy):
         self.log(f"Close, {self.dataclose[0]:.2f}")
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
-        if self.order:
+        # Bars up to the checkpoint only warm up indicators in incremental mode
+        if self.warming_up() or self.order:
             return
 
         # Check if we are in the market
@@ -0,0 +1,27 @@
+import numpy as np
+
+from .kernel import IndicatorSpec, KernelStrategy, jit, sma
+
+
+@jit
+def ma_kernel(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray, ma: np.ndarray
+) -> np.ndarray:
+    # NaN keeps the current position, so a rejected buy is retried only while the signal holds
+    target = np.full(len(close), np.nan)
+    for i in range(len(close)):
+        # Be in the market when close is above the moving average
+        if close[i] > ma[i]:
+            target[i] = 1.0
+        # Be out of the market when close is below the moving average
+        elif close[i] < ma[i]:
+            target[i] = 0.0
+    return target
+
+
+# Ma strategy compiled as a per-bar kernel
+MaKernelStrategy = KernelStrategy(
+    kernel=ma_kernel,
+    indicators=(IndicatorSpec(sma, "close", ("maperiod",)),),
+    params={"maperiod": 15},
+)
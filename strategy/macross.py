@@ -30,7 +30,8 @@ class MaCrossStrategy(BaseStrategy):
         self.log(f"Close, {self.dataclose[0]:.2f}")
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
-        if self.order:
+        # Bars up to the checkpoint only warm up indicators in incremental mode
+        if self.warming_up() or self.order:
             return
 
         # Check if we are in the market
@@ -0,0 +1,49 @@
+import numpy as np
+
+from .kernel import IndicatorSpec, KernelStrategy, jit, sma
+
+
+@jit
+def macross_kernel(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    ma_fast: np.ndarray,
+    ma_slow: np.ndarray,
+) -> np.ndarray:
+    # NaN keeps the current position, so a rejected buy is not retried until the next golden cross
+    target = np.full(len(close), np.nan)
+    # Last non zero difference, same as backtrader CrossOver
+    last_diff = np.nan
+    for i in range(len(close)):
+        diff = ma_fast[i] - ma_slow[i]
+        if np.isnan(diff):
+            continue
+
+        crossover = 0
+        if last_diff < 0 and diff > 0:
+            crossover = 1
+        elif last_diff > 0 and diff < 0:
+            crossover = -1
+        if diff != 0 or np.isnan(last_diff):
+            last_diff = diff
+
+        # Buy on golden cross, sell on death cross
+        if crossover > 0:
+            target[i] = 1.0
+        elif crossover < 0:
+            target[i] = 0.0
+    return target
+
+
+# MaCross strategy compiled as a per-bar kernel
+MaCrossKernelStrategy = KernelStrategy(
+    kernel=macross_kernel,
+    indicators=(
+        IndicatorSpec(sma, "close", ("fast_length",)),
+        IndicatorSpec(sma, "close", ("slow_length",)),
+    ),
+    params={"fast_length": 10, "slow_length": 50},
+)
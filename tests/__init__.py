@@ -1,5 +1,20 @@
+from .cache_test import BudgetCacheTest
+from .jobs_test import JobQueueTest
+from .kernel_test import KernelStrategyTest
+from .live_test import LiveStrategyTest
 from .ma_test import MaStrategyTest
 from .macross_test import MaCrossStrategyTest
+from .multi_test import MultiStrategyTest
+from .robustness_test import RobustnessTest
 
 
-__all__ = ["MaStrategyTest", "MaCrossStrategyTest"]
\ No newline at end of file
+__all__ = [
+    "MaStrategyTest",
+    "MaCrossStrategyTest",
+    "KernelStrategyTest",
+    "MultiStrategyTest",
+    "LiveStrategyTest",
+    "BudgetCacheTest",
+    "JobQueueTest",
+    "RobustnessTest",
+]
\ No newline at end of file
@@ -9,6 +9,7 @@ import pandas as pd
 
 from strategy.base import BaseStrategy
 from utils.load import load_strategy
+from utils.schemas import BacktraderParams
 
 
 class StrategyTest(unittest.TestCase):
@@ -25,6 +26,10 @@ class StrategyTest(unittest.TestCase):
         start_date = datetime(2024, 1, 1)
         end_date = datetime(2025, 1, 1)
         data = bt.feeds.PandasData(dataname=stock_hfq_df, fromdate=start_date, todate=end_date)
+        self.stock_df = stock_hfq_df
+        self.bt_params = BacktraderParams(
+            start_date=start_date, end_date=end_date, start_cash=1000000, commission_fee=0.001, stake=100
+        )
 
         # 设置回测引擎
         self.cerebro = cerebro = bt.Cerebro()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+from utils.cache import SPILL_SUBDIR, BudgetCache, sizeof
+
+
+class BudgetCacheTest(unittest.TestCase):
+    """budget cache test"""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.spill_dir = tmp_dir.name
+        self.value = b"x" * 1000
+        self.size = sizeof(self.value)
+
+    def spill_path(self, name: str) -> str:
+        return os.path.join(self.spill_dir, SPILL_SUBDIR, name)
+
+    def spill_files(self) -> list:
+        return sorted(name for name in os.listdir(os.path.join(self.spill_dir, SPILL_SUBDIR)) if name.endswith(".pkl"))
+
+    def test_lru_order(self):
+        cache = BudgetCache(max_bytes=self.size * 3, spill_dir=None)
+        for key in ["a", "b", "c"]:
+            cache.put(key, self.value)
+        cache.get("a")
+        cache.put("d", self.value)
+
+        self.assertNotIn("b", cache)
+        for key in ["a", "c", "d"]:
+            self.assertIn(key, cache)
+        self.assertEqual(cache.stats().evictions, 1)
+
+    def test_byte_accounting(self):
+        cache = BudgetCache(max_bytes=self.size * 10, spill_dir=None)
+        cache.put("a", self.value)
+        cache.put("b", self.value)
+        cache.put("a", b"y" * 10)
+
+        stats = cache.stats()
+        self.assertEqual(stats.entries, 2)
+        self.assertEqual(stats.size_bytes, self.size + sizeof(b"y" * 10))
+
+    def test_get_returns_copy(self):
+        cache = BudgetCache(max_bytes=self.size * 10, spill_dir=None)
+        cache.put("a", {"x": [1]})
+        cache.get("a")[1]["x"].append(2)
+
+        self.assertEqual(cache.get("a"), (True, {"x": [1]}))
+        self.assertEqual(cache.stats().hits, 2)
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(cache.stats().misses, 1)
+
+    def test_oversized_entry(self):
+        cache = BudgetCache(max_bytes=self.size - 1, spill_dir=None)
+        cache.put("a", self.value)
+
+        stats = cache.stats()
+        self.assertNotIn("a", cache)
+        self.assertEqual((stats.entries, stats.size_bytes, stats.evictions), (0, 0, 1))
+
+    def test_spill_and_reload(self):
+        cache = BudgetCache(max_bytes=self.size, spill_dir=self.spill_dir)
+        cache.put("a", self.value)
+        cache.put("b", self.value)
+        self.assertEqual(self.spill_files(), ["a.pkl"])
+        self.assertIn("a", cache)
+
+        # Reloading "a" evicts "b" to disk
+        self.assertEqual(cache.get("a"), (True, self.value))
+        self.assertEqual(self.spill_files(), ["b.pkl"])
+        stats = cache.stats()
+        self.assertEqual((stats.spills, stats.spill_hits, stats.spilled_entries), (2, 1, 1))
+        self.assertEqual(stats.spill_size_bytes, os.path.getsize(self.spill_path("b.pkl")))
+
+    def test_spill_budget(self):
+        cache = BudgetCache(max_bytes=self.size, spill_dir=self.spill_dir, spill_max_bytes=self.size * 2 + 100)
+        for key in ["a", "b", "c", "d"]:
+            cache.put(key, self.value)
+
+        # "d" is in memory, only the two newest spilled entries fit on disk
+        self.assertEqual(self.spill_files(), ["b.pkl", "c.pkl"])
+        self.assertNotIn("a", cache)
+        self.assertLessEqual(cache.stats().spill_size_bytes, self.size * 2 + 100)
+
+    def test_index_spill_dir(self):
+        cache = BudgetCache(max_bytes=self.size, spill_dir=self.spill_dir)
+        for key in ["a", "b", "c"]:
+            cache.put(key, self.value)
+        os.utime(self.spill_path("a.pkl"), (0, 0))
+
+        # A new process counts the files left on disk and trims them to its budget on first use
+        cache = BudgetCache(max_bytes=self.size, spill_dir=self.spill_dir, spill_max_bytes=self.size + 100)
+        self.assertEqual(self.spill_files(), ["a.pkl", "b.pkl"])
+        self.assertIn("b", cache)
+        self.assertEqual(self.spill_files(), ["b.pkl"])
+        self.assertEqual(cache.stats().spilled_entries, 1)
+        self.assertEqual(cache.get("b"), (True, self.value))
+        self.assertEqual(self.spill_files(), [])
+
+    def test_clear(self):
+        cache = BudgetCache(max_bytes=self.size, spill_dir=self.spill_dir)
+        cache.put("a", self.value)
+        cache.put("b", self.value)
+        cache.clear()
+
+        stats = cache.stats()
+        self.assertEqual((stats.entries, stats.size_bytes, stats.spilled_entries, stats.spill_size_bytes), (0, 0, 0, 0))
+        self.assertEqual(self.spill_files(), [])
+
+    def test_foreign_files_kept(self):
+        os.makedirs(os.path.join(self.spill_dir, SPILL_SUBDIR))
+        foreign = [os.path.join(self.spill_dir, "model.pkl"), self.spill_path("notes.txt")]
+        for path in foreign:
+            with open(path, "wb") as f:
+                f.write(self.value)
+
+        cache = BudgetCache(max_bytes=10, spill_dir=self.spill_dir, spill_max_bytes=10)
+        cache.put("a", self.value)
+        cache.clear()
+        for path in foreign:
+            self.assertTrue(os.path.exists(path))
@@ -0,0 +1,77 @@
+import os
+import signal
+import time
+import unittest
+from unittest import mock
+
+from utils.cache import cache
+from utils.jobs import JobQueue, _result_key
+from utils.processing import backtest
+from utils.schemas import StrategyBase
+
+from .base_test import StrategyTest
+
+
+class JobQueueTest(StrategyTest):
+    """job queue test"""
+
+    def setUp(self):
+        super().setUp()
+        self.queue = JobQueue(max_workers=1)
+        self.addCleanup(self.queue.shutdown)
+        self.addCleanup(cache.clear)
+        self.strategy = StrategyBase(name="Ma", params={"maperiod": range(3, 31)})
+
+    def wait(self, job_id: str, timeout: float = 120) -> str:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            info = self.queue.info(job_id)
+            if info.status in ("done", "failed"):
+                return info.status
+            time.sleep(0.1)
+        self.fail(f"job {job_id} did not finish")
+
+    def test_dedupe(self):
+        with mock.patch.object(self.queue._executor, "submit", wraps=self.queue._executor.submit) as submit:
+            job_id = self.queue.submit(self.stock_df, self.strategy, self.bt_params)
+            self.assertEqual(self.queue.submit(self.stock_df, self.strategy, self.bt_params), job_id)
+            self.assertEqual(self.wait(job_id), "done")
+
+            # Finished jobs are served from the cache
+            self.assertEqual(self.queue.submit(self.stock_df, self.strategy, self.bt_params), job_id)
+            self.assertEqual(submit.call_count, 1)
+        self.result = self.queue.result(job_id)
+
+    def test_result_in_cache(self):
+        job_id = self.queue.submit(self.stock_df, self.strategy, self.bt_params)
+        self.assertEqual(self.wait(job_id), "done")
+
+        # The done callback moves the result into the BudgetCache and drops the future
+        deadline = time.time() + 10
+        while _result_key(job_id) not in cache and time.time() < deadline:
+            time.sleep(0.1)
+        self.assertNotIn(job_id, self.queue._jobs)
+        self.assertEqual(self.queue.info(job_id).status, "done")
+        self.result = self.queue.result(job_id)
+        expected = backtest(self.stock_df.copy(), self.strategy, self.bt_params, maxcpus=1)
+        self.assertEqual(self.result.round(10).to_dict(), expected.round(10).to_dict())
+
+        # Evicted results are reported as unknown jobs
+        cache.clear()
+        self.assertIsNone(self.queue.info(job_id))
+        self.assertIsNone(self.queue.result(job_id))
+
+    @unittest.skipUnless(hasattr(signal, "SIGKILL"), "requires SIGKILL")
+    def test_worker_killed(self):
+        job_id = self.queue.submit(self.stock_df, self.strategy, self.bt_params)
+        while not self.queue._executor._processes:
+            time.sleep(0.1)
+        for pid in list(self.queue._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        self.assertEqual(self.wait(job_id), "failed")
+        self.assertIn("BrokenProcessPool", self.queue.info(job_id).error)
+
+        # The pool is rebuilt on the next submit, and the failed job can be resubmitted
+        job_id = self.queue.submit(self.stock_df, self.strategy, self.bt_params)
+        self.assertEqual(self.wait(job_id), "done")
+        self.result = self.queue.result(job_id)
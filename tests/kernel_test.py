@@ -0,0 +1,59 @@
+import pandas as pd
+
+from strategy import (
+    MaCrossKernelStrategy,
+    MaCrossStrategy,
+    MaKernelStrategy,
+    MaStrategy,
+)
+from strategy.kernel import IndicatorSpec
+from utils.schemas import StrategyBase
+from utils.simulator import run_kernel
+
+from .base_test import StrategyTest, run_back_trader
+
+
+class KernelStrategyTest(StrategyTest):
+    """kernel strategy test"""
+
+    def assert_same_result(self, expected: pd.DataFrame) -> None:
+        # base cerebro uses the default risk free rate for sharpe, kernels use 0 like backtest
+        columns = expected.columns.drop("sharpe")
+        pd.testing.assert_frame_equal(self.result[columns], expected[columns], check_dtype=False)
+
+    def test_ma_kernel(self):
+        params = {"maperiod": range(3, 31)}
+        self.result = run_kernel(
+            self.stock_df, StrategyBase(name="MaKernel", params=params), MaKernelStrategy, self.bt_params
+        )
+        self.assert_same_result(run_back_trader(self.cerebro, MaStrategy, **params))
+
+    def test_macross_kernel(self):
+        params = {"fast_length": range(1, 11, 5), "slow_length": range(25, 35, 5)}
+        self.result = run_kernel(
+            self.stock_df, StrategyBase(name="MaCrossKernel", params=params), MaCrossKernelStrategy, self.bt_params
+        )
+        self.assert_same_result(run_back_trader(self.cerebro, MaCrossStrategy, **params))
+
+    def set_low_cash(self) -> None:
+        # About one stake at the median price, so buys at higher prices are rejected
+        start_cash = float(self.stock_df["close"].median() * self.bt_params.stake)
+        self.bt_params = self.bt_params.model_copy(update={"start_cash": start_cash})
+        self.cerebro.broker.setcash(start_cash)
+
+    def test_ma_kernel_low_cash(self):
+        self.set_low_cash()
+        self.test_ma_kernel()
+
+    def test_macross_kernel_low_cash(self):
+        self.set_low_cash()
+        self.test_macross_kernel()
+
+    def test_indicator_cache_key(self):
+        # An indicator function with the same name from another module must not reuse cached arrays
+        def sma(x, period):
+            return x * 0
+
+        spec = IndicatorSpec(sma, "close", ("maperiod",))
+        self.assertNotEqual(spec.key({"maperiod": 5}), MaKernelStrategy.indicators[0].key({"maperiod": 5}))
+        self.result = pd.DataFrame()
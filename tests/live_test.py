@@ -0,0 +1,103 @@
+import tempfile
+from unittest import mock
+
+import backtrader as bt
+import pandas as pd
+
+import strategy
+from strategy.base import BaseStrategy
+from utils import live
+from utils.processing import backtest
+from utils.schemas import AkshareParams, StrategyBase
+
+from .base_test import StrategyTest
+
+
+class EmaStrategy(BaseStrategy):
+    """ema strategy, the indicator depends on every past bar"""
+
+    _name = "Ema"
+    params = (("period", 20),)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.ema = bt.indicators.EMA(self.datas[0], period=self.params.period)
+
+    def next(self) -> None:
+        if self.warming_up() or self.order:
+            return
+
+        if not self.position:
+            if self.datas[0].close[0] > self.ema[0]:
+                self.order = self.buy()
+        elif self.datas[0].close[0] < self.ema[0]:
+            self.order = self.sell()
+
+
+class NoWarmupStrategy(BaseStrategy):
+    """strategy that does not call warming_up"""
+
+    _name = "NoWarmup"
+
+    def next(self) -> None:
+        if not self.position:
+            self.order = self.buy()
+
+
+class LiveStrategyTest(StrategyTest):
+    """incremental backtest test"""
+
+    def setUp(self):
+        super().setUp()
+        self.ak_params = AkshareParams(
+            symbol="600070", period="daily", start_date="20230101", end_date="20250101", adjust="hfq"
+        )
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        for patcher in [
+            mock.patch.object(live, "CHECKPOINT_DIR", tmp_dir.name),
+            mock.patch.object(strategy, "EmaStrategy", EmaStrategy, create=True),
+            mock.patch.object(strategy, "NoWarmupStrategy", NoWarmupStrategy, create=True),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_live(self, strategy: StrategyBase, bt_params) -> None:
+        # Resume twice from checkpoints on a growing prefix, then compare with a full backtest
+        dates = pd.to_datetime(self.stock_df["date"]).dt.date
+        for end_date in ["2024-05-01", "2024-09-01"]:
+            prefix = self.stock_df[dates < pd.Timestamp(end_date).date()]
+            live.run_backtrader_live(prefix.copy(), strategy, bt_params, self.ak_params, maxcpus=1)
+        self.result = live.run_backtrader_live(self.stock_df.copy(), strategy, bt_params, self.ak_params, maxcpus=1)
+
+        expected = backtest(self.stock_df.copy(), strategy, bt_params, maxcpus=1)
+        pd.testing.assert_frame_equal(self.result, expected, check_dtype=False)
+
+    def test_ma_live(self):
+        self.run_live(StrategyBase(name="Ma", params={"maperiod": range(3, 31)}), self.bt_params)
+
+    def test_macross_live_low_cash(self):
+        # About one stake at the median price, so buys at higher prices are rejected
+        start_cash = float(self.stock_df["close"].median() * self.bt_params.stake)
+        bt_params = self.bt_params.model_copy(update={"start_cash": start_cash})
+        params = {"fast_length": range(1, 11, 5), "slow_length": range(25, 35, 5)}
+        self.run_live(StrategyBase(name="MaCross", params=params), bt_params)
+
+    def test_narrow_sweep_keeps_checkpoints(self):
+        self.run_live(StrategyBase(name="Ma", params={"maperiod": range(3, 31)}), self.bt_params)
+        live.run_backtrader_live(
+            self.stock_df.copy(), StrategyBase(name="Ma", params={"maperiod": [5]}), self.bt_params, self.ak_params
+        )
+        strategy = StrategyBase(name="Ma", params={"maperiod": range(3, 31)})
+        saved = live.load_checkpoints(live.checkpoint_path(self.ak_params, strategy, self.bt_params))
+        self.assertEqual(len(saved.checkpoints), len(range(3, 31)))
+
+    def test_ema_live(self):
+        # EMA is not fixed window, so resuming re-warms it from the start date
+        self.run_live(StrategyBase(name="Ema", params={"period": range(5, 35, 5)}), self.bt_params)
+
+    def test_requires_warming_up(self):
+        strategy = StrategyBase(name="NoWarmup", params={})
+        with self.assertRaises(RuntimeError):
+            live.run_backtrader_live(self.stock_df.copy(), strategy, self.bt_params, self.ak_params, maxcpus=1)
+        self.result = pd.DataFrame()
@@ -0,0 +1,60 @@
+from unittest import mock
+
+import pandas as pd
+
+from strategy import MaCrossKernelStrategy, MaKernelStrategy
+from strategy.base import parse_param_tag
+from strategy.kernel import sma
+from utils.processing import backtest, backtest_multi
+from utils.schemas import StrategyBase
+
+from .base_test import StrategyTest
+
+
+class MultiStrategyTest(StrategyTest):
+    """multi strategy test"""
+
+    def assert_same_as_single(self, strategies: list) -> None:
+        # Same params and scores as sweeping each strategy on its own
+        for strategy in strategies:
+            expected = backtest(self.stock_df.copy(), strategy, self.bt_params, maxcpus=1)
+            result = self.result[self.result["strategy"] == strategy.name].reset_index(drop=True)
+            self.assertEqual(len(result), len(expected))
+
+            params = pd.DataFrame([parse_param_tag(tag) for tag in result["params"]])
+            pd.testing.assert_frame_equal(params[list(strategy.params)], expected[list(strategy.params)])
+            for column in ["return", "dd", "sharpe"]:
+                pd.testing.assert_series_equal(result[column], expected[column], check_dtype=False)
+
+    def test_multi(self):
+        strategies = [
+            StrategyBase(name="Ma", params={"maperiod": range(3, 31)}),
+            StrategyBase(name="MaCross", params={"fast_length": range(1, 11, 5), "slow_length": range(25, 35, 5)}),
+            StrategyBase(
+                name="MaCrossKernel", params={"fast_length": range(1, 11, 5), "slow_length": range(25, 35, 5)}
+            ),
+        ]
+        self.result = backtest_multi(self.stock_df.copy(), strategies, self.bt_params, maxcpus=1)
+        self.assertEqual(list(self.result.columns), ["strategy", "params", "return", "dd", "sharpe"])
+        self.assertEqual(self.result["strategy"].unique().tolist(), ["Ma", "MaCross", "MaCrossKernel"])
+        self.assert_same_as_single(strategies)
+
+    def test_shared_indicators(self):
+        strategies = [
+            StrategyBase(name="MaKernel", params={"maperiod": range(20, 31)}),
+            StrategyBase(name="MaCrossKernel", params={"fast_length": [5, 10], "slow_length": [25, 30]}),
+        ]
+        counted = mock.Mock(side_effect=sma)
+        with mock.patch.object(
+            MaKernelStrategy, "indicators", tuple(spec._replace(func=counted) for spec in MaKernelStrategy.indicators)
+        ), mock.patch.object(
+            MaCrossKernelStrategy,
+            "indicators",
+            tuple(spec._replace(func=counted) for spec in MaCrossKernelStrategy.indicators),
+        ):
+            self.result = backtest_multi(self.stock_df.copy(), strategies, self.bt_params, maxcpus=1)
+
+        # Periods 25 and 30 are used by both strategies but computed once
+        periods = [call.args[1] for call in counted.call_args_list]
+        self.assertEqual(sorted(periods), [5, 10] + list(range(20, 31)))
+        self.assert_same_as_single(strategies)
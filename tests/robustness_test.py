@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from strategy import MaKernelStrategy
+from utils.robustness import (
+    TRADING_DAYS,
+    block_bootstrap,
+    kernel_bars,
+    loss_probability,
+    monte_carlo,
+    record_bars,
+    summarize,
+)
+from utils.schemas import StrategyBase
+
+from .base_test import StrategyTest
+
+
+class RobustnessTest(StrategyTest):
+    """monte carlo robustness test"""
+
+    def test_block_bootstrap(self):
+        idx = block_bootstrap(50, 30, 7, np.random.default_rng(0))
+        self.assertEqual(idx.shape, (30, 50))
+        self.assertGreaterEqual(idx.min(), 0)
+        self.assertLess(idx.max(), 50)
+        # Each block is a run of consecutive bars
+        self.assertTrue((np.diff(idx[:, :7], axis=1) == 1).all())
+
+        # Block size is clipped to the sample length
+        idx = block_bootstrap(5, 3, 20, np.random.default_rng(0))
+        self.assertEqual(idx.tolist(), [list(range(5))] * 3)
+        self.result = pd.DataFrame(idx)
+
+    def test_constant_returns(self):
+        self.result = monte_carlo(np.full(100, 0.001), n_paths=10, seed=0)
+        self.assertEqual(len(self.result), 10)
+        expected = math.expm1(math.log(1.001) * TRADING_DAYS) * 100
+        np.testing.assert_allclose(self.result["return"], expected)
+        np.testing.assert_allclose(self.result["dd"], 0.0)
+        self.assertEqual(loss_probability(self.result), 0.0)
+        self.assertEqual(list(summarize(self.result).index), ["p5", "p25", "p50", "p75", "p95", "mean"])
+
+    def test_seed(self):
+        returns = np.random.default_rng(1).normal(0.0005, 0.01, 300)
+        turnover = np.full(300, 0.1)
+        self.result = monte_carlo(returns, turnover, n_paths=2500, slippage=0.001, seed=7)
+        pd.testing.assert_frame_equal(self.result, monte_carlo(returns, turnover, n_paths=2500, slippage=0.001, seed=7))
+        self.assertFalse(self.result.equals(monte_carlo(returns, turnover, n_paths=2500, slippage=0.001, seed=8)))
+
+    def test_empty_returns(self):
+        self.result = monte_carlo(np.array([]), n_paths=10)
+        self.assertTrue(self.result.empty)
+
+    def test_kernel_bars(self):
+        params = {"maperiod": 12}
+        for start_cash in [self.bt_params.start_cash, float(self.stock_df["close"].median() * self.bt_params.stake)]:
+            bt_params = self.bt_params.model_copy(update={"start_cash": start_cash})
+            expected = record_bars(self.stock_df, StrategyBase(name="Ma", params=params), bt_params)
+            result = kernel_bars(
+                self.stock_df, StrategyBase(name="MaKernel", params=params), MaKernelStrategy, bt_params
+            )
+            for key, values in expected.items():
+                np.testing.assert_allclose(result[key], values, rtol=0, atol=1e-12, err_msg=key)
+        self.result = pd.DataFrame(result["returns"])
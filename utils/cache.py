@@ -0,0 +1,262 @@
+import copy
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+from pydantic import BaseModel
+
+from .logs import logger
+from .schemas import CacheStats
+
+# 内存缓存上限, 可通过环境变量 CACHE_MAX_MB 配置
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_MB", 512)) * 1024 * 1024
+
+# 淘汰条目的落盘目录, 为空时直接丢弃
+CACHE_SPILL_DIR = os.environ.get("CACHE_SPILL_DIR") or None
+
+# 落盘缓存上限, 可通过环境变量 CACHE_SPILL_MAX_MB 配置
+CACHE_SPILL_MAX_BYTES = int(os.environ.get("CACHE_SPILL_MAX_MB", 4096)) * 1024 * 1024
+
+# 落盘文件写入 spill_dir 下的专用子目录, 只管理该子目录中的文件
+SPILL_SUBDIR = "budget_cache"
+
+
+def sizeof(value: Any) -> int:
+    """估算缓存值占用的内存字节数, DataFrame 按 memory_usage(deep=True) 统计"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return sys.getsizeof(value)
+
+
+def _copy(value: Any) -> Any:
+    """返回缓存值的副本, 避免调用方修改缓存内容"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+def _arg_bytes(arg: Any) -> bytes:
+    """参数的哈希内容, DataFrame 按内容计算, pydantic 模型按 model_dump 计算"""
+    if isinstance(arg, pd.DataFrame):
+        return repr(list(arg.columns)).encode("utf-8") + pd.util.hash_pandas_object(arg, index=True).values.tobytes()
+    if isinstance(arg, BaseModel):
+        return repr(arg.model_dump()).encode("utf-8")
+    return repr(arg).encode("utf-8")
+
+
+class BudgetCache:
+    """按字节预算的 LRU 缓存
+
+    超出预算时淘汰最久未使用的条目, 设置 spill_dir 时淘汰的条目写入磁盘,
+    再次命中时读回内存. 落盘文件位于 spill_dir 的 budget_cache 子目录, 首次使用缓存时索引
+    子目录中已有的落盘文件并计入落盘预算, 未使用缓存的进程 (如回测工作进程) 不会扫描目录
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = CACHE_MAX_BYTES,
+        spill_dir: Optional[str] = CACHE_SPILL_DIR,
+        spill_max_bytes: int = CACHE_SPILL_MAX_BYTES,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.spill_dir = os.path.join(spill_dir, SPILL_SUBDIR) if spill_dir is not None else None
+        self.spill_max_bytes = spill_max_bytes
+        self._entries: Dict[str, Tuple[Any, int]] = OrderedDict()
+        self._spilled: Dict[str, int] = OrderedDict()
+        self._size = 0
+        self._spill_size = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "spills": 0, "spill_hits": 0}
+        self._lock = threading.Lock()
+        self._indexed = spill_dir is None
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """查询缓存
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            Tuple[bool, Any]: 是否命中和缓存值的副本
+        """
+        with self._lock:
+            self._index_spill_dir()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return True, _copy(self._entries[key][0])
+            spilled = key in self._spilled
+            if spilled:
+                # 先移出落盘索引, 在锁外读取文件, 避免磁盘读取阻塞其他会话
+                self._spill_size -= self._spilled.pop(key)
+            else:
+                self._stats["misses"] += 1
+                return False, None
+
+        value = self._load_spilled(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return False, None
+            self._stats["hits"] += 1
+            self._stats["spill_hits"] += 1
+            self._put(key, value)
+            return True, _copy(value)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._index_spill_dir()
+            return key in self._entries or key in self._spilled
+
+    def put(self, key: str, value: Any) -> None:
+        """写入缓存, 超出预算时淘汰最久未使用的条目"""
+        with self._lock:
+            self._index_spill_dir()
+            self._put(key, value)
+
+    def stats(self) -> CacheStats:
+        """缓存命中、淘汰和容量统计"""
+        with self._lock:
+            self._index_spill_dir()
+            return CacheStats(
+                entries=len(self._entries),
+                size_bytes=self._size,
+                max_bytes=self.max_bytes,
+                spilled_entries=len(self._spilled),
+                spill_size_bytes=self._spill_size,
+                **self._stats,
+            )
+
+    def clear(self) -> None:
+        """清空内存和磁盘缓存"""
+        with self._lock:
+            self._index_spill_dir()
+            for key in list(self._spilled):
+                self._remove_spilled(key)
+            self._entries.clear()
+            self._size = 0
+
+    def _put(self, key: str, value: Any) -> None:
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        size = sizeof(value)
+        if size > self.max_bytes:
+            # 单个条目超过预算, 不进入内存
+            self._evict(key, value, size)
+            return
+
+        self._entries[key] = (value, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            old_key, (old_value, old_size) = self._entries.popitem(last=False)
+            self._size -= old_size
+            self._evict(old_key, old_value, old_size)
+
+    def _evict(self, key: str, value: Any, size: int) -> None:
+        self._stats["evictions"] += 1
+        if self.spill_dir is None:
+            return
+        if key in self._spilled:
+            self._remove_spilled(key)
+
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._spill_path(key), "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning(f"缓存落盘失败 {key}: {e}")
+            return
+
+        self._spilled[key] = os.path.getsize(self._spill_path(key))
+        self._spill_size += self._spilled[key]
+        self._stats["spills"] += 1
+        self._trim_spilled()
+
+    def _trim_spilled(self) -> None:
+        # 超出落盘预算时删除最早落盘的文件
+        while self._spill_size > self.spill_max_bytes and self._spilled:
+            self._remove_spilled(next(iter(self._spilled)))
+
+    def _index_spill_dir(self) -> None:
+        # 之前运行留下的落盘文件, 按修改时间从早到晚加入索引, 只在首次使用时扫描一次
+        if self._indexed:
+            return
+        self._indexed = True
+        try:
+            names = os.listdir(self.spill_dir)
+        except OSError:
+            return
+        files = []
+        for name in names:
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.spill_dir, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name[: -len(".pkl")], stat.st_size))
+        for _, key, size in sorted(files):
+            self._spilled[key] = size
+            self._spill_size += size
+        self._trim_spilled()
+
+    def _load_spilled(self, key: str) -> Any:
+        # 读取并删除落盘文件, 调用方已将其移出索引
+        path = self._spill_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"读取落盘缓存失败 {key}: {e}")
+            value = None
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return value
+
+    def _remove_spilled(self, key: str) -> None:
+        self._spill_size -= self._spilled.pop(key)
+        try:
+            os.remove(self._spill_path(key))
+        except OSError:
+            pass
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.pkl")
+
+
+# 进程内共享的缓存, 所有会话共用同一预算
+cache = BudgetCache()
+
+
+def budget_cache(func: Callable) -> Callable:
+    """使用共享的 BudgetCache 缓存函数结果, 缓存键由函数名和参数计算"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        h = hashlib.sha1(f"{func.__module__}.{func.__qualname__}".encode("utf-8"))
+        for arg in args:
+            h.update(_arg_bytes(arg))
+        for name, arg in sorted(kwargs.items()):
+            h.update(name.encode("utf-8") + _arg_bytes(arg))
+        key = h.hexdigest()
+
+        hit, value = cache.get(key)
+        if hit:
+            return value
+        value = func(*args, **kwargs)
+        cache.put(key, value)
+        return _copy(value)
+
+    return wrapper
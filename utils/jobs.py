@@ -0,0 +1,175 @@
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+import streamlit as st
+
+from .cache import cache
+from .live import run_backtrader_live
+from .logs import logger
+from .processing import backtest, backtest_multi
+from .schemas import AkshareParams, BacktraderParams, JobInfo, StrategyBase
+
+# 所有会话共享的回测进程数上限, 可通过环境变量 MAX_WORKERS 配置, 默认 CPU 核数
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS") or os.cpu_count() or 1)
+
+# 保留的失败任务数量, 超出后丢弃最早失败的任务
+MAX_FINISHED_JOBS = 100
+
+
+def _run_job(
+    stock_df: pd.DataFrame,
+    strategy: Union[StrategyBase, List[StrategyBase]],
+    bt_params: BacktraderParams,
+    ak_params: Optional[AkshareParams],
+) -> pd.DataFrame:
+    """在工作进程中运行回测
+
+    每个任务只占用一个进程, 保证总并发不超过 MAX_WORKERS
+    """
+    if isinstance(strategy, list):
+        return backtest_multi(stock_df, strategy, bt_params, maxcpus=1)
+    if ak_params is not None:
+        return run_backtrader_live(stock_df, strategy, bt_params, ak_params, maxcpus=1)
+    return backtest(stock_df, strategy, bt_params, maxcpus=1)
+
+
+def job_key(
+    stock_df: pd.DataFrame,
+    strategy: Union[StrategyBase, List[StrategyBase]],
+    bt_params: BacktraderParams,
+    ak_params: Optional[AkshareParams] = None,
+) -> str:
+    """任务 ID, 由股票数据和全部参数计算, 相同输入得到相同 ID"""
+    h = hashlib.sha1(pd.util.hash_pandas_object(stock_df, index=True).values.tobytes())
+    params = {
+        "strategy": [s.model_dump() for s in strategy] if isinstance(strategy, list) else strategy.model_dump(),
+        "backtrader": bt_params.model_dump(mode="json"),
+        "akshare": ak_params.model_dump() if ak_params is not None else None,
+    }
+    h.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class JobQueue:
+    """本地回测任务队列
+
+    任务提交到共享的进程池后立即返回任务 ID, 页面通过任务 ID 轮询状态和结果,
+    正在运行或已完成的相同任务不会重复提交. 已完成任务的结果保存在 BudgetCache 中,
+    随缓存预算淘汰. 工作进程异常退出 (如内存不足被杀) 时重建进程池, 未完成的任务标记为失败
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_finished: int = MAX_FINISHED_JOBS) -> None:
+        self._max_workers = max_workers
+        self._executor = self._new_executor()
+        self._jobs: Dict[str, Future] = OrderedDict()
+        self._max_finished = max_finished
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        stock_df: pd.DataFrame,
+        strategy: Union[StrategyBase, List[StrategyBase]],
+        bt_params: BacktraderParams,
+        ak_params: Optional[AkshareParams] = None,
+    ) -> str:
+        """提交回测任务
+
+        Args:
+            stock_df (pd.DataFrame): 股票数据
+            strategy (Union[StrategyBase, List[StrategyBase]]): 策略名称和参数, 多个策略时一次完成多策略参数优化
+            bt_params (BacktraderParams): 回测参数
+            ak_params (Optional[AkshareParams]): akshare 参数, 不为 None 时使用增量回测 (仅单个策略)
+
+        Returns:
+            str: 任务 ID
+        """
+        job_id = job_key(stock_df, strategy, bt_params, ak_params)
+        with self._lock:
+            future = self._jobs.get(job_id)
+            if (future is not None and not future.done()) or _result_key(job_id) in cache:
+                logger.info(f"任务 {job_id} 已存在, 不重复提交")
+                return job_id
+
+            try:
+                future = self._executor.submit(_run_job, stock_df, strategy, bt_params, ak_params)
+            except BrokenProcessPool:
+                self._restart()
+                future = self._executor.submit(_run_job, stock_df, strategy, bt_params, ak_params)
+            self._jobs[job_id] = future
+            self._evict()
+        future.add_done_callback(functools.partial(self._collect, job_id))
+        logger.info(f"提交任务 {job_id}: {strategy}")
+        return job_id
+
+    def info(self, job_id: str) -> Optional[JobInfo]:
+        """查询任务状态, 任务不存在或结果已被缓存淘汰时返回 None"""
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is None:
+            return JobInfo(job_id=job_id, status="done") if _result_key(job_id) in cache else None
+        if not future.done():
+            return JobInfo(job_id=job_id, status="running" if future.running() else "pending")
+        if future.cancelled():
+            return JobInfo(job_id=job_id, status="failed", error="回测进程池已重建, 任务被取消")
+        error = future.exception()
+        if error is not None:
+            return JobInfo(job_id=job_id, status="failed", error=repr(error))
+        return JobInfo(job_id=job_id, status="done")
+
+    def result(self, job_id: str) -> Optional[pd.DataFrame]:
+        """获取已完成任务的结果, 结果已被缓存淘汰时返回 None"""
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+            return future.result()
+        return cache.get(_result_key(job_id))[1]
+
+    def shutdown(self) -> None:
+        """关闭进程池, 取消未开始的任务"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _collect(self, job_id: str, future: Future) -> None:
+        # 成功任务的结果转入缓存, 只保留失败任务的 future
+        if future.cancelled() or future.exception() is not None:
+            return
+        cache.put(_result_key(job_id), future.result())
+        with self._lock:
+            if self._jobs.get(job_id) is future:
+                del self._jobs[job_id]
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn 避免 fork 带有多个线程的 streamlit 进程
+        return ProcessPoolExecutor(max_workers=self._max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _restart(self) -> None:
+        # 进程池损坏后无法再提交任务, 取消旧进程池中未完成的任务并重建
+        logger.error("回测进程异常退出, 重建进程池")
+        executor, self._executor = self._executor, self._new_executor()
+        executor.shutdown(wait=False, cancel_futures=True)
+        for future in self._jobs.values():
+            if not future.done():
+                future.cancel()
+
+    def _evict(self) -> None:
+        finished = [job_id for job_id, future in self._jobs.items() if future.done()]
+        for job_id in finished[: max(len(finished) - self._max_finished, 0)]:
+            del self._jobs[job_id]
+
+
+def _result_key(job_id: str) -> str:
+    return f"job_{job_id}"
+
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """进程内唯一的任务队列, 所有会话共享"""
+    return JobQueue()
@@ -0,0 +1,297 @@
+import contextlib
+import datetime
+import hashlib
+import itertools
+import json
+import math
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional
+
+import backtrader as bt
+import pandas as pd
+
+from strategy.base import BaseStrategy, param_tag
+from strategy.kernel import KernelStrategy
+
+from .logs import logger
+from .processing import build_cerebro, get_strategy_cls
+from .schemas import (
+    AkshareParams,
+    BacktraderParams,
+    Checkpoint,
+    LiveCheckpoints,
+    StrategyBase,
+)
+from .simulator import annual_scores, run_kernel
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+CHECKPOINT_DIR = "./checkpoints"
+
+
+class CheckpointAnalyzer(bt.Analyzer):
+    """检查点分析器
+
+    逐 bar 累加收益、回撤和年度净值, 并在回测结束时记录现金、持仓和未成交订单,
+    增量模式下只统计检查点之后的 bar
+    """
+
+    def start(self) -> None:
+        self.ckpt = self.strategy.checkpoint()
+        if self.ckpt is None:
+            value = self.strategy.broker.getvalue()
+            self.value_start = value
+            self.value_peak = value
+            self.max_drawdown = 0.0
+            self.bars = 0
+            self.year_values = {}
+        else:
+            self.value_start = self.ckpt.value_start
+            self.value_peak = self.ckpt.value_peak
+            self.max_drawdown = self.ckpt.max_drawdown
+            self.bars = self.ckpt.bars
+            self.year_values = dict(self.ckpt.year_values)
+
+    def prenext(self) -> None:
+        # 指标预热期间策略不调用 next, 仍统计净值
+        self._record()
+
+    def next(self) -> None:
+        if getattr(self.strategy, "_warming_up_len", None) != len(self.strategy):
+            raise RuntimeError(f"{type(self.strategy).__name__}.next() 需要先调用 self.warming_up() 才能增量回测")
+        self._record()
+
+    def _record(self) -> None:
+        dt = self.strategy.datas[0].datetime.date(0)
+        if self.ckpt is not None and dt <= self.ckpt.date:
+            return
+
+        value = self.strategy.broker.getvalue()
+        self.bars += 1
+        self.value_peak = max(self.value_peak, value)
+        self.max_drawdown = max(self.max_drawdown, 100.0 * (self.value_peak - value) / self.value_peak)
+        self.year_values[dt.year] = value
+
+    def stop(self) -> None:
+        data = self.strategy.datas[0]
+        position = self.strategy.getposition(data)
+
+        # 最后一根 bar 上提交的订单会在下一根 bar 成交, 需要在恢复时重新提交
+        order = self.strategy.order
+        order_size = 0.0
+        if order is not None and order.alive():
+            size = abs(order.created.size)
+            order_size = size if order.isbuy() else -size
+
+        self.rets["checkpoint"] = Checkpoint(
+            date=data.datetime.date(0),
+            close=data.close[0],
+            cash=self.strategy.broker.getcash(),
+            position_size=position.size,
+            position_price=position.price,
+            order_size=order_size,
+            minperiod=self.strategy._minperiod,
+            value_start=self.value_start,
+            value_peak=self.value_peak,
+            max_drawdown=self.max_drawdown,
+            bars=self.bars,
+            year_values=self.year_values,
+        )
+
+
+def checkpoint_scores(ckpt: Checkpoint) -> List[Optional[float]]:
+    """根据检查点计算年化收益、最大回撤和夏普比率
+
+    口径与 backtrader 的 Returns、DrawDown 和 SharpeRatio(按年, 无风险利率为 0) 分析器一致
+
+    Args:
+        ckpt (Checkpoint): 检查点
+
+    Returns:
+        List[Optional[float]]: [return, dd, sharpe]
+    """
+    year_values = [ckpt.year_values[year] for year in sorted(ckpt.year_values)]
+    return annual_scores(ckpt.value_start, year_values, ckpt.bars, ckpt.max_drawdown)
+
+
+def checkpoint_path(ak_params: AkshareParams, strategy: StrategyBase, bt_params: BacktraderParams) -> str:
+    """检查点文件路径
+
+    结束日期不参与计算, 其余数据和回测参数变化时使用新的检查点文件
+    """
+    key = {
+        "akshare": ak_params.model_dump(exclude={"end_date"}),
+        "backtrader": bt_params.model_dump(mode="json", exclude={"end_date"}),
+        "strategy": strategy.name,
+    }
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CHECKPOINT_DIR, f"{ak_params.symbol}_{strategy.name}_{digest}.json")
+
+
+def load_checkpoints(path: str) -> Optional[LiveCheckpoints]:
+    """加载检查点, 文件不存在或损坏时返回 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return LiveCheckpoints.model_validate_json(f.read())
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logger.warning(f"检查点文件损坏, 重新回测: {e}")
+        return None
+
+
+@contextlib.contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """进程间互斥锁, 锁定 path 旁的 .lock 文件"""
+    with open(f"{path}.lock", "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def save_checkpoints(path: str, checkpoints: Dict[str, Checkpoint]) -> None:
+    """保存检查点
+
+    与已保存的检查点合并, 本次未回测的参数组合保留原检查点. 读取、合并和写入在文件锁内完成,
+    多个进程同时保存时不会互相覆盖; 先写入临时文件再替换, 读取时不会读到写了一半的文件
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _file_lock(path):
+        saved = load_checkpoints(path)
+        if saved is not None:
+            checkpoints = {**saved.checkpoints, **checkpoints}
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(LiveCheckpoints(checkpoints=checkpoints).model_dump_json())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def _valid_checkpoints(
+    saved: Optional[LiveCheckpoints], tags: List[str], stock_df: pd.DataFrame
+) -> Optional[Dict[str, Checkpoint]]:
+    """检查已保存的检查点能否用于本次增量回测
+
+    需要覆盖全部参数组合, 且每个检查点当天的收盘价与新数据一致 (前复权数据会改写历史价格).
+    不同参数组合的检查点日期可以不同, 如之后只回测过其中一部分参数组合
+    """
+    if saved is None or any(tag not in saved.checkpoints for tag in tags):
+        return None
+    checkpoints = {tag: saved.checkpoints[tag] for tag in tags}
+    dates = stock_df.index.date
+    for ckpt in {ckpt.date: ckpt for ckpt in checkpoints.values()}.values():
+        if ckpt.date not in dates:
+            return None
+        close = stock_df.loc[dates == ckpt.date, "close"].iloc[-1]
+        if not math.isclose(close, ckpt.close):
+            logger.info(f"{ckpt.date} 收盘价变化 ({ckpt.close} -> {close}), 重新回测")
+            return None
+    return checkpoints
+
+
+def run_backtrader_live(
+    stock_df: pd.DataFrame,
+    strategy: StrategyBase,
+    bt_params: BacktraderParams,
+    ak_params: AkshareParams,
+    maxcpus: Optional[int] = None,
+) -> pd.DataFrame:
+    """增量回测
+
+    首次运行时回测全部历史并保存每个参数组合的检查点, 之后只从检查点之后的新 bar 开始产生信号.
+    fixed_window 策略在检查点之前只保留 minperiod 根 bar 预热指标, 其余策略从回测开始日期预热
+
+    Args:
+        stock_df (pd.DataFrame): 股票数据
+        strategy (StrategyBase): 策略名称和参数
+        bt_params (BacktraderParams): 回测参数
+        ak_params (AkshareParams): akshare 参数, 用于区分检查点文件
+        maxcpus (Optional[int]): 参数优化使用的进程数, None 表示使用全部 CPU
+
+    Returns:
+        pd.DataFrame: 回测结果, 与 backtest 格式相同
+    """
+    strategy_cls = get_strategy_cls(strategy.name)
+    if isinstance(strategy_cls, KernelStrategy):
+        # 向量化策略全量回测的开销已与新数据量相当, 不保存检查点
+        return run_kernel(stock_df, strategy, strategy_cls, bt_params)
+    if not issubclass(strategy_cls, BaseStrategy):
+        raise ValueError(f"增量回测需要继承 BaseStrategy: {strategy.name}")
+
+    # 设置日期索引并截取回测区间
+    stock_df = stock_df.copy()
+    stock_df.index = pd.to_datetime(stock_df["date"])
+    dates = stock_df.index.date
+    stock_df = stock_df[(dates >= bt_params.start_date) & (dates <= bt_params.end_date)]
+
+    # 参数组合标签, 未扫描的参数使用策略默认值
+    defaults = dict(strategy_cls.params._getpairs())
+    combos = [dict(zip(strategy.params.keys(), values)) for values in itertools.product(*strategy.params.values())]
+    tags = [param_tag({**defaults, **combo}) for combo in combos]
+
+    path = checkpoint_path(ak_params, strategy, bt_params)
+    checkpoints = _valid_checkpoints(load_checkpoints(path), tags, stock_df)
+
+    feed_df = stock_df
+    if checkpoints is not None:
+        # 从最早的检查点开始回测, 检查点较晚的参数组合在各自的检查点之前只做预热
+        ckpt_date: datetime.date = min(ckpt.date for ckpt in checkpoints.values())
+        dates = stock_df.index.date
+        new_df = stock_df[dates > ckpt_date]
+        if new_df.empty:
+            logger.info(f"{path} 无新数据, 直接使用检查点")
+            return _scores_df(strategy, combos, [checkpoints[tag] for tag in tags])
+
+        if strategy_cls.fixed_window:
+            warmup = max(ckpt.minperiod for ckpt in checkpoints.values())
+            feed_df = pd.concat([stock_df[dates <= ckpt_date].iloc[-warmup:], new_df])
+        else:
+            # 指标依赖全部历史 bar, 从回测开始日期重新计算, 检查点之前的 bar 仍不产生信号
+            warmup = int((dates <= ckpt_date).sum())
+        logger.info(f"增量回测 {path}: {len(new_df)} 根新 bar, {warmup} 根预热 bar")
+    else:
+        logger.info(f"全量回测 {path}: {len(stock_df)} 根 bar")
+
+    # 初始化回测引擎
+    cerebro = build_cerebro(feed_df, bt_params, scores=False)
+    cerebro.addanalyzer(CheckpointAnalyzer, _name="checkpoint")
+    cerebro.optstrategy(strategy_cls, resume=[checkpoints], **strategy.params)
+
+    # 运行回测
+    back = cerebro.run(maxcpus=maxcpus)
+
+    # 保存检查点
+    new_checkpoints = {}
+    for x in back:
+        new_checkpoints[param_tag(x[0].params._getkwargs())] = x[0].analyzers.checkpoint.get_analysis()["checkpoint"]
+    save_checkpoints(path, new_checkpoints)
+
+    return _scores_df(strategy, combos, [new_checkpoints[tag] for tag in tags])
+
+
+def _scores_df(strategy: StrategyBase, combos: List[dict], checkpoints: List[Checkpoint]) -> pd.DataFrame:
+    """由参数组合和检查点生成回测结果"""
+    par_list = [list(combo.values()) + checkpoint_scores(ckpt) for combo, ckpt in zip(combos, checkpoints)]
+    columns = list(strategy.params.keys())
+    columns.extend(["return", "dd", "sharpe"])
+    return pd.DataFrame(par_list, columns=columns)
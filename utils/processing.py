@@ -1,21 +1,24 @@
+import itertools
 import logging
+from typing import List, Optional, Tuple, Type, Union
 
 import akshare as ak
 import backtrader as bt
 import backtrader.analyzers as btanalyzers
 import pandas as pd
-import streamlit as st
 
+from strategy.base import param_tag
+from strategy.kernel import KernelStrategy
+
+from .cache import budget_cache
 from .logs import logger
 from .schemas import AkshareParams, BacktraderParams, StrategyBase
+from .simulator import run_kernel, run_kernels
 
 logging.getLogger("streamlit.runtime.scriptrunner_utils").setLevel(logging.ERROR)
 
 
-model_hash_func = lambda x: x.model_dump()
-
-
-@st.cache_data(hash_funcs={AkshareParams: model_hash_func})
+@budget_cache
 def gen_stock_df(ak_params: AkshareParams) -> pd.DataFrame:
     """生成股票数据
 
@@ -31,25 +34,40 @@ def gen_stock_df(ak_params: AkshareParams) -> pd.DataFrame:
     return pd.DataFrame()
 
 
-@st.cache_data(hash_funcs={StrategyBase: model_hash_func, BacktraderParams: model_hash_func})
-def run_backtrader(stock_df: pd.DataFrame, strategy: StrategyBase, bt_params: BacktraderParams) -> pd.DataFrame:
-    """运行回测
+def get_strategy_cls(name: str) -> Union[Type[bt.Strategy], KernelStrategy]:
+    """根据策略名称动态导入策略类
+
+    Args:
+        name (str): 策略名称, 如 Ma
+
+    Returns:
+        Union[Type[bt.Strategy], KernelStrategy]: 策略类, 或向量化策略
+    """
+    try:
+        return getattr(__import__("strategy"), f"{name}Strategy")
+    except (ImportError, AttributeError) as e:
+        logger.error(f"策略导入失败: {e}")
+        raise ValueError(f"无法找到策略: {name}Strategy")
+
+
+def build_cerebro(stock_df: pd.DataFrame, bt_params: BacktraderParams, scores: bool = True) -> bt.Cerebro:
+    """初始化回测引擎, 创建回测区间内的数据源, 设置资金、佣金和下单数量
 
     Args:
         stock_df (pd.DataFrame): 股票数据
-        strategy (StrategyBase): 策略名称和参数
         bt_params (BacktraderParams): 回测参数
+        scores (bool): 是否添加收益、回撤和夏普比率分析器
 
     Returns:
-        pd.DataFrame: 回测结果
+        bt.Cerebro: 回测引擎
     """
     # 设置日期索引
+    stock_df = stock_df.copy()
     stock_df.index = pd.to_datetime(stock_df["date"])
 
     # 创建数据源
     data = bt.feeds.PandasData(dataname=stock_df, fromdate=bt_params.start_date, todate=bt_params.end_date)
 
-    # 初始化回测引擎
     cerebro = bt.Cerebro()
     cerebro.adddata(data)
     cerebro.broker.setcash(bt_params.start_cash)
@@ -57,20 +75,39 @@ def run_backtrader(stock_df: pd.DataFrame, strategy: StrategyBase, bt_params: Ba
     cerebro.addsizer(bt.sizers.FixedSize, stake=bt_params.stake)
 
     # 添加分析器
-    cerebro.addanalyzer(btanalyzers.SharpeRatio, _name="sharpe", riskfreerate=0.0)
-    cerebro.addanalyzer(btanalyzers.DrawDown, _name="drawdown")
-    cerebro.addanalyzer(btanalyzers.Returns, _name="returns")
+    if scores:
+        cerebro.addanalyzer(btanalyzers.SharpeRatio, _name="sharpe", riskfreerate=0.0)
+        cerebro.addanalyzer(btanalyzers.DrawDown, _name="drawdown")
+        cerebro.addanalyzer(btanalyzers.Returns, _name="returns")
+    return cerebro
 
-    # 动态导入策略类
-    try:
-        strategy_cli = getattr(__import__("strategy"), f"{strategy.name}Strategy")
-        cerebro.optstrategy(strategy_cli, **strategy.params)
-    except (ImportError, AttributeError) as e:
-        logger.error(f"策略导入失败: {e}")
-        raise ValueError(f"无法找到策略: {strategy.name}Strategy")
+
+def backtest(
+    stock_df: pd.DataFrame, strategy: StrategyBase, bt_params: BacktraderParams, maxcpus: Optional[int] = None
+) -> pd.DataFrame:
+    """运行回测
+
+    Args:
+        stock_df (pd.DataFrame): 股票数据
+        strategy (StrategyBase): 策略名称和参数
+        bt_params (BacktraderParams): 回测参数
+        maxcpus (Optional[int]): 参数优化使用的进程数, None 表示使用全部 CPU
+
+    Returns:
+        pd.DataFrame: 回测结果
+    """
+    # 动态导入策略类, 向量化策略使用统一的成交模拟器
+    strategy_cls = get_strategy_cls(strategy.name)
+    if isinstance(strategy_cls, KernelStrategy):
+        return run_kernel(stock_df, strategy, strategy_cls, bt_params)
+
+    # 初始化回测引擎
+    cerebro = build_cerebro(stock_df, bt_params)
+
+    cerebro.optstrategy(strategy_cls, **strategy.params)
 
     # 运行回测
-    back = cerebro.run()
+    back = cerebro.run(maxcpus=maxcpus)
 
     # 处理回测结果
     par_list = []
@@ -81,13 +118,7 @@ def run_backtrader(stock_df: pd.DataFrame, strategy: StrategyBase, bt_params: Ba
             par.append(x[0].params._getkwargs()[param])
 
         # 添加性能指标
-        par.extend(
-            [
-                x[0].analyzers.returns.get_analysis()["rnorm100"],
-                x[0].analyzers.drawdown.get_analysis()["max"]["drawdown"],
-                x[0].analyzers.sharpe.get_analysis()["sharperatio"],
-            ]
-        )
+        par.extend(_scores(x[0]))
         par_list.append(par)
 
     # 创建结果数据框
@@ -95,3 +126,68 @@ def run_backtrader(stock_df: pd.DataFrame, strategy: StrategyBase, bt_params: Ba
     columns.extend(["return", "dd", "sharpe"])
     par_df = pd.DataFrame(par_list, columns=columns)
     return par_df
+
+
+def backtest_multi(
+    stock_df: pd.DataFrame, strategies: List[StrategyBase], bt_params: BacktraderParams, maxcpus: Optional[int] = None
+) -> pd.DataFrame:
+    """多策略参数优化
+
+    向量化策略共用指标缓存并批量模拟, backtrader 策略的全部参数组合放入同一个回测引擎,
+    数据源只创建和预加载一次. backtrader 的指标属于各自的策略实例, 每个参数组合仍单独运行一遍
+    并各自计算指标, 需要共享指标时使用对应的向量化策略
+
+    Args:
+        stock_df (pd.DataFrame): 股票数据
+        strategies (List[StrategyBase]): 多个策略的名称和参数
+        bt_params (BacktraderParams): 回测参数
+        maxcpus (Optional[int]): 参数优化使用的进程数, None 表示使用全部 CPU
+
+    Returns:
+        pd.DataFrame: 回测结果, 列为 strategy, params, return, dd, sharpe
+    """
+    kernels = []
+    combos = []
+    cls_names = {}
+    for strategy in strategies:
+        strategy_cls = get_strategy_cls(strategy.name)
+        if isinstance(strategy_cls, KernelStrategy):
+            kernels.append((strategy, strategy_cls))
+        else:
+            cls_names[strategy_cls] = strategy.name
+            for values in itertools.product(*strategy.params.values()):
+                combos.append((strategy_cls, dict(zip(strategy.params.keys(), values))))
+
+    par_list = run_kernels(stock_df, kernels, bt_params)
+
+    if combos:
+        # 初始化回测引擎
+        cerebro = build_cerebro(stock_df, bt_params)
+
+        # 所有策略的参数组合作为同一个优化参数
+        cerebro.optstrategy(_make_strategy, combo=combos)
+
+        # 运行回测
+        back = cerebro.run(maxcpus=maxcpus)
+        for x in back:
+            par_list.append([cls_names[x[0].strategycls], param_tag(x[0].params._getkwargs())] + _scores(x[0]))
+
+    # 按策略输入顺序排列
+    names = [strategy.name for strategy in strategies]
+    par_list.sort(key=lambda par: names.index(par[0]))
+    return pd.DataFrame(par_list, columns=["strategy", "params", "return", "dd", "sharpe"])
+
+
+def _make_strategy(*datas: bt.feeds.PandasData, combo: Tuple[Type[bt.Strategy], dict]) -> bt.Strategy:
+    # optstrategy 的策略工厂, combo 为策略类和参数
+    strategy_cls, params = combo
+    return strategy_cls(*datas, **params)
+
+
+def _scores(strat: bt.Strategy) -> list:
+    # 年化收益、最大回撤和夏普比率
+    return [
+        strat.analyzers.returns.get_analysis()["rnorm100"],
+        strat.analyzers.drawdown.get_analysis()["max"]["drawdown"],
+        strat.analyzers.sharpe.get_analysis()["sharperatio"],
+    ]
@@ -0,0 +1,232 @@
+import math
+from typing import Dict, Optional
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from strategy.kernel import KernelStrategy
+
+from .processing import build_cerebro, get_strategy_cls
+from .schemas import BacktraderParams, RobustnessParams, StrategyBase
+from .simulator import TRADING_DAYS, kernel_data, simulate_fills
+
+# 每批计算的路径数, 控制单批数组的内存占用
+CHUNK_PATHS = 1000
+
+# 蒙特卡洛结果列, 夏普比率按逐期收益率年化, 与参数优化结果的 sharpe 区分
+MC_COLUMNS = ["return", "dd", "sharpe_ann"]
+
+
+class BarRecorder(bt.Analyzer):
+    """逐 bar 记录策略收益率和换手率, 以及每笔已平仓交易的收益率"""
+
+    def start(self) -> None:
+        self.value = self.strategy.broker.getvalue()
+        self.traded = 0.0
+        self.returns = []
+        self.turnover = []
+        self.trade_returns = []
+        self.trade_turnover = []
+        self._opened: Dict[int, float] = {}
+
+    def notify_order(self, order: bt.Order) -> None:
+        if order.status == order.Completed:
+            self.traded += abs(order.executed.size * order.executed.price)
+
+    def notify_trade(self, trade: bt.Trade) -> None:
+        if trade.justopened:
+            self._opened[trade.ref] = abs(trade.value)
+        elif trade.isclosed:
+            value = self.strategy.broker.getvalue()
+            self.trade_returns.append(trade.pnlcomm / value)
+            self.trade_turnover.append(2 * self._opened.pop(trade.ref, 0.0) / value)
+
+    def next(self) -> None:
+        value = self.strategy.broker.getvalue()
+        self.returns.append(value / self.value - 1)
+        self.turnover.append(self.traded / self.value)
+        self.value = value
+        self.traded = 0.0
+
+    def get_analysis(self) -> dict:
+        return {
+            "returns": np.asarray(self.returns),
+            "turnover": np.asarray(self.turnover),
+            "trade_returns": np.asarray(self.trade_returns),
+            "trade_turnover": np.asarray(self.trade_turnover),
+        }
+
+
+def record_bars(stock_df: pd.DataFrame, strategy: StrategyBase, bt_params: BacktraderParams) -> dict:
+    """单个参数组合回测一次, 记录逐 bar 收益率、换手率和交易收益率
+
+    Args:
+        stock_df (pd.DataFrame): 股票数据
+        strategy (StrategyBase): 策略名称和参数, 参数为单个取值
+        bt_params (BacktraderParams): 回测参数
+
+    Returns:
+        dict: BarRecorder 的记录结果
+    """
+    strategy_cls = get_strategy_cls(strategy.name)
+    if isinstance(strategy_cls, KernelStrategy):
+        return kernel_bars(stock_df, strategy, strategy_cls, bt_params)
+
+    cerebro = build_cerebro(stock_df, bt_params, scores=False)
+    cerebro.addanalyzer(BarRecorder, _name="bars")
+    cerebro.addstrategy(strategy_cls, **strategy.params)
+    return cerebro.run()[0].analyzers.bars.get_analysis()
+
+
+def kernel_bars(
+    stock_df: pd.DataFrame, strategy: StrategyBase, kernel: KernelStrategy, bt_params: BacktraderParams
+) -> dict:
+    """向量化策略的逐 bar 收益率、换手率和交易收益率, 由成交模拟器的净值和持仓计算
+
+    Args:
+        stock_df (pd.DataFrame): 股票数据
+        strategy (StrategyBase): 策略名称和参数, 参数为单个取值
+        kernel (KernelStrategy): 向量化策略
+        bt_params (BacktraderParams): 回测参数
+
+    Returns:
+        dict: 与 BarRecorder 的记录结果格式相同
+    """
+    data, _ = kernel_data(stock_df, bt_params)
+    target = kernel.target(data, strategy.params, {})
+    values, positions = simulate_fills(
+        data["open"], data["close"], target, bt_params.stake, bt_params.start_cash, bt_params.commission_fee
+    )
+    value_prev = np.concatenate([[bt_params.start_cash], values[:-1]])
+    position_prev = np.concatenate([[0.0], positions[:-1]])
+
+    # 一笔交易从空仓开仓到重新空仓, 期间只有现金变化
+    opened = np.flatnonzero((position_prev == 0) & (positions != 0))
+    closed = np.flatnonzero((position_prev != 0) & (positions == 0))
+    opened = opened[: len(closed)]
+
+    return {
+        "returns": values / value_prev - 1,
+        "turnover": np.abs(positions - position_prev) * data["open"] / value_prev,
+        "trade_returns": (values[closed] - value_prev[opened]) / values[closed],
+        "trade_turnover": 2 * np.abs(positions[opened]) * data["open"][opened] / values[closed],
+    }
+
+
+def block_bootstrap(n: int, n_paths: int, block_size: int, rng: np.random.Generator) -> np.ndarray:
+    """移动块自助法的抽样下标
+
+    Args:
+        n (int): 样本长度
+        n_paths (int): 路径数
+        block_size (int): 块长度
+        rng (np.random.Generator): 随机数生成器
+
+    Returns:
+        np.ndarray: 形状为 (n_paths, n) 的下标
+    """
+    block_size = max(1, min(block_size, n))
+    n_blocks = math.ceil(n / block_size)
+    starts = rng.integers(0, n - block_size + 1, size=(n_paths, n_blocks))
+    return (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :n]
+
+
+def monte_carlo(
+    returns: np.ndarray,
+    turnover: Optional[np.ndarray] = None,
+    n_paths: int = 2000,
+    block_size: int = 20,
+    slippage: float = 0.0,
+    periods_per_year: float = TRADING_DAYS,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """对收益率序列做块自助重抽样, 批量计算每条路径的收益、回撤和夏普比率
+
+    sharpe_ann 由逐期收益率的均值和标准差乘以 sqrt(periods_per_year) 年化, 与参数优化结果中
+    按年度收益率计算的 sharpe (backtrader SharpeRatio) 口径不同, 不可直接比较
+
+    Args:
+        returns (np.ndarray): 逐期收益率
+        turnover (Optional[np.ndarray]): 逐期换手率 (成交额 / 净值), 用于计算滑点成本
+        n_paths (int): 路径数
+        block_size (int): 块长度
+        slippage (float): 额外滑点/佣金噪声的标准差, 每期成本为 换手率 * |N(0, slippage)|
+        periods_per_year (float): 年化系数
+        seed (Optional[int]): 随机种子
+
+    Returns:
+        pd.DataFrame: 每条路径一行, 列为 return (年化收益 %), dd (最大回撤 %), sharpe_ann (逐期收益率的年化夏普比率)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n = len(returns)
+    if n == 0:
+        return pd.DataFrame(columns=MC_COLUMNS)
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for start in range(0, n_paths, CHUNK_PATHS):
+        size = min(CHUNK_PATHS, n_paths - start)
+        idx = block_bootstrap(n, size, block_size, rng)
+        paths = returns[idx]
+        if turnover is not None and slippage > 0:
+            paths = paths - np.asarray(turnover, dtype=np.float64)[idx] * np.abs(rng.normal(0.0, slippage, paths.shape))
+
+        equity = np.cumprod(1 + paths, axis=1)
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rnorm100 = np.expm1(np.log(equity[:, -1]) / n * periods_per_year) * 100
+            sharpe = paths.mean(axis=1) / paths.std(axis=1) * np.sqrt(periods_per_year)
+        dd = 100 * ((peak - equity) / peak).max(axis=1)
+        results.append(np.column_stack([rnorm100, dd, np.where(np.isfinite(sharpe), sharpe, np.nan)]))
+
+    return pd.DataFrame(np.vstack(results), columns=MC_COLUMNS)
+
+
+def robustness_analysis(
+    stock_df: pd.DataFrame, strategy: StrategyBase, bt_params: BacktraderParams, mc_params: RobustnessParams
+) -> pd.DataFrame:
+    """参数组合的蒙特卡洛稳健性分析
+
+    回测一次记录收益率, 再按 bar 收益率或交易收益率做块自助重抽样
+
+    Args:
+        stock_df (pd.DataFrame): 股票数据
+        strategy (StrategyBase): 策略名称和参数, 参数为单个取值
+        bt_params (BacktraderParams): 回测参数
+        mc_params (RobustnessParams): 蒙特卡洛参数
+
+    Returns:
+        pd.DataFrame: 每条路径的 return, dd, sharpe_ann
+    """
+    bars = record_bars(stock_df, strategy, bt_params)
+    if mc_params.method == "trades":
+        returns, turnover = bars["trade_returns"], bars["trade_turnover"]
+        # 按每年平均交易次数年化
+        periods_per_year = len(returns) / max(len(bars["returns"]), 1) * TRADING_DAYS
+    else:
+        returns, turnover = bars["returns"], bars["turnover"]
+        periods_per_year = TRADING_DAYS
+
+    return monte_carlo(
+        returns,
+        turnover,
+        n_paths=mc_params.n_paths,
+        block_size=mc_params.block_size,
+        slippage=mc_params.slippage,
+        periods_per_year=periods_per_year,
+        seed=mc_params.seed,
+    )
+
+
+def summarize(mc_df: pd.DataFrame) -> pd.DataFrame:
+    """蒙特卡洛结果的分位数统计和均值"""
+    summary = mc_df.quantile([0.05, 0.25, 0.5, 0.75, 0.95])
+    summary.index = [f"p{int(q * 100)}" for q in summary.index]
+    summary.loc["mean"] = mc_df.mean()
+    return summary
+
+
+def loss_probability(mc_df: pd.DataFrame) -> float:
+    """年化收益为负的路径比例"""
+    return float((mc_df["return"] < 0).mean())
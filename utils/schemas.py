@@ -1,5 +1,5 @@
 import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Literal, Optional
 
 from pydantic import BaseModel
 
@@ -29,3 +29,59 @@ class StrategyBase(BaseModel):
 
     name: str
     params: Dict[str, Any]
+
+
+class Checkpoint(BaseModel):
+    """增量回测检查点, 记录单个参数组合在最后一根 bar 上的状态"""
+
+    date: datetime.date
+    close: float
+    cash: float
+    position_size: float
+    position_price: float
+    order_size: float
+    minperiod: int
+    value_start: float
+    value_peak: float
+    max_drawdown: float
+    bars: int
+    year_values: Dict[int, float]
+
+
+class LiveCheckpoints(BaseModel):
+    """增量回测检查点集合, 键为参数组合标签"""
+
+    checkpoints: Dict[str, Checkpoint]
+
+
+class JobInfo(BaseModel):
+    """回测任务状态"""
+
+    job_id: str
+    status: Literal["pending", "running", "done", "failed"]
+    error: Optional[str] = None
+
+
+class CacheStats(BaseModel):
+    """缓存统计"""
+
+    hits: int
+    misses: int
+    evictions: int
+    spills: int
+    spill_hits: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+    spilled_entries: int
+    spill_size_bytes: int
+
+
+class RobustnessParams(BaseModel):
+    """蒙特卡洛稳健性分析参数"""
+
+    method: Literal["bars", "trades"] = "bars"
+    n_paths: int = 2000
+    block_size: int = 20
+    slippage: float = 0.0
+    seed: Optional[int] = None
@@ -0,0 +1,213 @@
+import itertools
+import math
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from strategy.base import param_tag
+from strategy.kernel import KernelStrategy, jit
+
+from .schemas import BacktraderParams, StrategyBase
+
+# 与 backtrader Returns 分析器一致, 日线年化系数
+TRADING_DAYS = 252
+
+
+@jit
+def simulate_fills(
+    open_: np.ndarray, close: np.ndarray, target: np.ndarray, stake: float, cash: float, commission: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """按目标持仓模拟成交, 返回每根 bar 收盘后的账户净值和持仓股数
+
+    与 backtrader 市价单一致: 第 i 根 bar 收盘后的目标持仓与实际持仓不同时下单, 在第 i + 1 根
+    bar 开盘成交, 佣金为成交额乘以 commission. 目标持仓为 NaN 时不下单.
+    买单与 BackBroker 一样检查两次资金: 提交时按创建价 (第 i 根 bar 收盘价), 成交时按开盘价,
+    任一次现金不足都拒绝买单, 被拒绝的订单不会重试
+
+    Args:
+        open_ (np.ndarray): 开盘价
+        close (np.ndarray): 收盘价
+        target (np.ndarray): 目标持仓, 以 stake 为单位
+        stake (float): 每单位目标持仓的股数
+        cash (float): 初始资金
+        commission (float): 佣金比例
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: 账户净值和持仓股数
+    """
+    values = np.empty(len(close))
+    positions = np.empty(len(close))
+    position = 0.0
+    for i in range(len(close)):
+        if i > 0 and not np.isnan(target[i - 1]):
+            size = target[i - 1] * stake - position
+            if size > 0:
+                # 提交时按创建价检查资金, 成交时再按开盘价检查
+                approved = cash - size * close[i - 1] - size * commission * close[i - 1] >= 0
+                cost = size * open_[i]
+                comm = size * commission * open_[i]
+                if approved and cash - cost - comm >= 0:
+                    cash -= cost + comm
+                    position += size
+            elif size < 0:
+                cash -= size * open_[i] - size * commission * open_[i]
+                position += size
+        values[i] = cash + position * close[i]
+        positions[i] = position
+    return values, positions
+
+
+@jit
+def simulate(
+    open_: np.ndarray, close: np.ndarray, target: np.ndarray, stake: float, cash: float, commission: float
+) -> np.ndarray:
+    """按目标持仓模拟成交, 返回每根 bar 收盘后的账户净值, 成交规则见 simulate_fills"""
+    return simulate_fills(open_, close, target, stake, cash, commission)[0]
+
+
+def annual_scores(value_start: float, year_values: List[float], bars: int, dd: float) -> List[Optional[float]]:
+    """根据每年最后一根 bar 的净值计算年化收益和夏普比率
+
+    口径与 backtrader 的 Returns、DrawDown 和 SharpeRatio(按年, 无风险利率为 0) 分析器一致
+
+    Args:
+        value_start (float): 初始资金
+        year_values (List[float]): 按年份排列的每年最后一根 bar 的净值
+        bars (int): bar 数量
+        dd (float): 最大回撤
+
+    Returns:
+        List[Optional[float]]: [return, dd, sharpe]
+    """
+    if not bars:
+        return [0.0, 0.0, None]
+
+    rnorm100 = math.expm1(math.log(year_values[-1] / value_start) / bars * TRADING_DAYS) * 100
+
+    returns = []
+    value_prev = value_start
+    for value in year_values:
+        returns.append(value / value_prev - 1)
+        value_prev = value
+    try:
+        sharpe = statistics.mean(returns) / statistics.pstdev(returns)
+    except (statistics.StatisticsError, ZeroDivisionError):
+        sharpe = None
+
+    return [rnorm100, dd, sharpe]
+
+
+def equity_scores(values: np.ndarray, years: np.ndarray, value_start: float) -> List[Optional[float]]:
+    """根据账户净值计算年化收益、最大回撤和夏普比率
+
+    Args:
+        values (np.ndarray): 每根 bar 的账户净值
+        years (np.ndarray): 每根 bar 所在年份
+        value_start (float): 初始资金
+
+    Returns:
+        List[Optional[float]]: [return, dd, sharpe]
+    """
+    if not len(values):
+        return [0.0, 0.0, None]
+
+    peak = np.maximum.accumulate(values)
+    dd = float((100.0 * (peak - values) / peak).max())
+
+    # 每年最后一根 bar 的净值
+    year_end = np.append(years[1:] != years[:-1], True)
+    return annual_scores(value_start, values[year_end].tolist(), len(values), dd)
+
+
+@jit
+def simulate_batch(
+    open_: np.ndarray, close: np.ndarray, targets: np.ndarray, stake: float, cash: float, commission: float
+) -> np.ndarray:
+    """批量模拟多个参数组合, targets 每行为一个参数组合的目标持仓, 返回同形状的账户净值"""
+    values = np.empty(targets.shape)
+    for j in range(targets.shape[0]):
+        values[j] = simulate(open_, close, targets[j], stake, cash, commission)
+    return values
+
+
+def kernel_data(stock_df: pd.DataFrame, bt_params: BacktraderParams) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """截取回测区间, 返回 OHLCV 数组和每根 bar 所在年份"""
+    dates = pd.to_datetime(stock_df["date"])
+    in_range = ((dates.dt.date >= bt_params.start_date) & (dates.dt.date <= bt_params.end_date)).to_numpy()
+    data = {
+        col: stock_df[col].to_numpy(dtype=np.float64)[in_range] for col in ["open", "high", "low", "close", "volume"]
+    }
+    return data, dates.dt.year.to_numpy()[in_range]
+
+
+def run_kernel(
+    stock_df: pd.DataFrame, strategy: StrategyBase, kernel: KernelStrategy, bt_params: BacktraderParams
+) -> pd.DataFrame:
+    """向量化策略参数优化, 每个参数组合调用一次 kernel 和 simulate, 相同指标只计算一次
+
+    Args:
+        stock_df (pd.DataFrame): 股票数据
+        strategy (StrategyBase): 策略名称和参数
+        kernel (KernelStrategy): 向量化策略
+        bt_params (BacktraderParams): 回测参数
+
+    Returns:
+        pd.DataFrame: 回测结果, 与 backtest 格式相同
+    """
+    data, years = kernel_data(stock_df, bt_params)
+
+    cache = {}
+    par_list = []
+    for values in itertools.product(*strategy.params.values()):
+        combo = dict(zip(strategy.params.keys(), values))
+        target = kernel.target(data, combo, cache)
+        equity = simulate(
+            data["open"], data["close"], target, bt_params.stake, bt_params.start_cash, bt_params.commission_fee
+        )
+        par_list.append(list(values) + equity_scores(equity, years, bt_params.start_cash))
+
+    columns = list(strategy.params.keys())
+    columns.extend(["return", "dd", "sharpe"])
+    return pd.DataFrame(par_list, columns=columns)
+
+
+def run_kernels(
+    stock_df: pd.DataFrame, kernels: List[Tuple[StrategyBase, KernelStrategy]], bt_params: BacktraderParams
+) -> List[list]:
+    """多个向量化策略的参数优化
+
+    所有策略共用一份指标缓存, 周期相同的指标只计算一次, 全部参数组合的目标持仓合并后
+    一次调用 simulate_batch
+
+    Args:
+        stock_df (pd.DataFrame): 股票数据
+        kernels (List[Tuple[StrategyBase, KernelStrategy]]): 策略名称和参数, 以及对应的向量化策略
+        bt_params (BacktraderParams): 回测参数
+
+    Returns:
+        List[list]: 每个参数组合一行, [strategy, params, return, dd, sharpe]
+    """
+    data, years = kernel_data(stock_df, bt_params)
+
+    cache = {}
+    tags = []
+    targets = []
+    for strategy, kernel in kernels:
+        for values in itertools.product(*strategy.params.values()):
+            combo = dict(zip(strategy.params.keys(), values))
+            tags.append([strategy.name, param_tag({**kernel.params, **combo})])
+            targets.append(kernel.target(data, combo, cache))
+    if not targets:
+        return []
+
+    equity = simulate_batch(
+        data["open"],
+        data["close"],
+        np.vstack(targets),
+        bt_params.stake,
+        bt_params.start_cash,
+        bt_params.commission_fee,
+    )
+    return [tag + equity_scores(row, years, bt_params.start_cash) for tag, row in zip(tags, equity)]